@@ -1,10 +1,15 @@
 """Option calculations using binomial stock_trees."""
 from collections import namedtuple
+import logging
 import math
+import numpy as np
+from numba import njit
 import utils
 
 Option = namedtuple('Option', ['S', 'K', 'price_fun'])
 
+logger = logging.getLogger(__name__)
+
 def binom_option(
         option: Option,
         discount_rate: float,
@@ -13,7 +18,58 @@ def binom_option(
         N: int,
         steps: int
 ):
-    """Calculate the value of an European option."""
+    """
+    Calculate the value of an European option.
+
+    The tree recombines, so only its last level is stored and rolled back to
+    the root. The returned trees only hold their root, use binom_option_full
+    for the complete trees.
+    """
+    u, cc_rate, q_u, q_d = _tree_parameters(
+        discount_rate, dividend_yield, sigma, N, steps)
+
+    # The jth node on the last level equals S * u^(steps - 1 - 2j).
+    stock = option.S * u ** np.arange(steps - 1, -steps, -2)
+    value = np.array([option.price_fun(stock_price, option.K)
+                      for stock_price in stock], dtype=np.float64)
+    root = _binom_rollback(value, q_u / cc_rate, q_d / cc_rate)
+
+    return (utils.Tree.from_nodes(1, [option.S]),
+            utils.Tree.from_nodes(1, [root]))
+
+def binom_option_full(
+        option: Option,
+        discount_rate: float,
+        dividend_yield: float,
+        sigma: float,
+        N: int,
+        steps: int
+):
+    """Calculate the value of an European option, keeping the full trees."""
+    u, cc_rate, q_u, q_d = _tree_parameters(
+        discount_rate, dividend_yield, sigma, N, steps)
+
+    # Both trees are stored level by level in a flat array, level i starts at
+    # offsets[i] and holds i + 1 nodes. The tree recombines so the jth node on
+    # level i equals S * u^(i - j) * d^j = S * u^(i - 2j).
+    offsets = utils.gauss_first_formula(np.arange(steps))
+    stock = np.empty(utils.gauss_first_formula(steps))
+    for i in range(steps):
+        stock[offsets[i]:offsets[i] + i + 1] = \
+                option.S * u ** np.arange(i, -i - 1, -2)
+
+    value = np.empty(len(stock))
+    value[offsets[-1]:] = [option.price_fun(stock_price, option.K)
+                           for stock_price in stock[offsets[-1]:]]
+    value_tree = utils.Tree.from_nodes(steps, value)
+    discounted_q_u = q_u / cc_rate
+    discounted_q_d = q_d / cc_rate
+    for i in range(steps - 2, -1, -1):
+        value_tree.step_backward(i, discounted_q_u, discounted_q_d)
+
+    return (utils.Tree.from_nodes(steps, stock), value_tree)
+
+def _tree_parameters(discount_rate, dividend_yield, sigma, N, steps):
     dt = N / steps
     u = math.exp(sigma * math.sqrt(dt))
     d = 1 / u
@@ -22,29 +78,21 @@ def binom_option(
     u_minus_d = u - d
     q_u = (math.exp((discount_rate - dividend_yield) * dt) - d) / u_minus_d
     q_d = 1 - q_u
-    print("u: {}, d: {}".format(u, d))
-    print("q_u: {}, q_d: {}".format(q_u, q_d))
-    print("exp((discount_rate - dividend_yield) * dt): {}".format(cc_rate))
-
-    stock_tree = utils.Tree(steps)
-    stock_tree.set_node(0, 0, option.S)
-    for i in range(1, steps):
-        stock_tree.set_node(i, 0, stock_tree.get_node(i - 1, 0) * u)
-        for j in range(1, i + 1):
-            stock_tree.set_node(i, j, stock_tree.get_node(i - 1, j - 1) * d)
-    last_level = stock_tree.get_level(steps)
-
-    value_tree = utils.Tree(steps)
-    for i in range(0, len(last_level)):
-        value_tree.set_node(
-            steps - 1, i,
-            option.price_fun(stock_tree.get_node(steps - 1, i), option.K))
+    logger.debug("u: %g, d: %g", u, d)
+    logger.debug("q_u: %g, q_d: %g", q_u, q_d)
+    logger.debug("exp(discount_rate * dt): %g", cc_rate)
+    return (u, cc_rate, q_u, q_d)
 
-    for i in range(steps - 2, -1, -1):
-        for j in range(1, i + 2):
-            v_t = (1 / cc_rate) * (
-                q_u * value_tree.get_node(i + 1, j - 1) +
-                q_d * value_tree.get_node(i + 1, j))
-            value_tree.set_node(i, j - 1, v_t)
 
-    return (stock_tree, value_tree)
+@njit(cache=True, fastmath=True)
+def _binom_rollback(value, discounted_q_u, discounted_q_d):
+    """
+    Roll the last level of a value tree back to the root in place.
+
+    The risk neutral probabilities are passed already discounted by one step.
+    """
+    for i in range(len(value) - 2, -1, -1):
+        for j in range(i + 1):
+            value[j] = discounted_q_u * value[j] + \
+                    discounted_q_d * value[j + 1]
+    return value[0]
@@ -5,11 +5,27 @@ Formula's from: https://en.wikipedia.org/wiki/Greeks_(finance)
 """
 
 
+from collections import namedtuple
 import math
+import sys
 from dataclasses import dataclass
 from enum import IntEnum
-from scipy.stats import norm
-import scipy.optimize as spOpt
+import numpy as np
+from scipy.special import ndtr
+
+import lets_be_rational
+
+try:
+    import _bsm_ext
+except ImportError:
+    # The C extension is optional, see the README on how to build it.
+    _bsm_ext = None
+
+
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+# The result of find_implied_vol, the implied vol is stored in root.
+ImpliedVol = namedtuple('ImpliedVol', ['root'])
 
 
 class OptionSide(IntEnum):
@@ -38,9 +54,145 @@ def find_implied_vol(
     if price_from_vol(4) < 0:
         raise ValueError(
             'Assuming volatility of 400% gives a price lower than given.')
+    # The price doesn't depend on the vol in these cases, so 0 is a solution.
+    if tau == 0 or spot == 0 or strike == 0:
+        return ImpliedVol(0.0)
+
+    # Let's Be Rational works with undiscounted prices on the forward.
+    discount = math.exp(-discount_rate * tau)
+    forward = spot * math.exp(-dividend_yield * tau) / discount
+    theta = 1 if side == OptionSide.Call else -1
+    sigma = lets_be_rational.implied_volatility_from_a_transformed_rational_guess(
+        price / discount, forward, strike, tau, theta)
+    # The checks above bound the vol, values outside of the bounds are due to
+    # rounding, e.g. when the price equals the intrinsic value.
+    return ImpliedVol(min(max(sigma, 0.0), 4.0))
+
+
+def find_implied_vol_batch(
+        prices,
+        sides,
+        spot,
+        strike,
+        tau,
+        discount_rate,
+        dividend_yield
+):
+    """
+    Find the implied vols for a batch of prices and parameters.
+
+    The arguments are broadcast against each other and an array of vols is
+    returned. Like find_implied_vol, raises a ValueError if a price can't be
+    obtained with a volatility between 0 and 400%.
+    """
+    vols = find_implied_vol_vec(prices, sides, spot, strike, tau,
+                                discount_rate, dividend_yield)
+    if np.any(np.isnan(vols)):
+        raise ValueError(
+            'No volatility between 0 and 400% gives the price for some options.')
+    return vols
+
+
+def find_implied_vol_vec(
+        prices,
+        sides,
+        spot,
+        strike,
+        tau,
+        discount_rate,
+        dividend_yield,
+        tol=1e-12,
+        max_iter=100
+):
+    """
+    Find the implied vols for arrays of prices and parameters at once.
+
+    All arguments are broadcast against each other. The vols are found using
+    Newton's method on all options simultaneously, falling back to bisection
+    whenever a Newton step leaves the bracket (0, 4). Where no volatility in
+    the bracket gives the price, the result is NaN.
+    """
+    prices, sides, spot, strike, tau, discount_rate, dividend_yield = \
+            np.broadcast_arrays(*(np.asarray(arg, dtype=np.float64) for arg in (
+                prices, sides, spot, strike, tau, discount_rate,
+                dividend_yield)))
+    sign = np.where(sides == OptionSide.Call, 1.0, -1.0)
+    sqrt_tau = np.sqrt(tau)
+    discounted_stock = spot * np.exp(-dividend_yield * tau)
+    discounted_strike = strike * np.exp(-discount_rate * tau)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_moneyness = np.log(discounted_stock / discounted_strike)
+        lower = np.zeros(prices.shape)
+        upper = np.full(prices.shape, 4.0)
+        min_price = np.maximum(sign * (discounted_stock - discounted_strike), 0)
+        max_price = _price_and_vega(upper, sign, log_moneyness, sqrt_tau,
+                                    discounted_stock, discounted_strike)[0]
+        # Without time to maturity the price doesn't depend on the vol.
+        max_price = np.where(sqrt_tau == 0, min_price, max_price)
+
+        # Newton's method converges monotonically from the inflection point
+        # of the price as a function of sigma.
+        sigma = np.sqrt(2 * np.abs(log_moneyness)) / sqrt_tau
+        sigma = np.where((sigma > lower) & (sigma < upper), sigma, 2.0)
+        for _ in range(max_iter):
+            price, vega = _price_and_vega(sigma, sign, log_moneyness, sqrt_tau,
+                                          discounted_stock, discounted_strike)
+            lower = np.where(price < prices, sigma, lower)
+            upper = np.where(price > prices, sigma, upper)
+            new_sigma = sigma - (price - prices) / vega
+            new_sigma = np.where((new_sigma > lower) & (new_sigma < upper),
+                                 new_sigma, (lower + upper) / 2)
+            converged = np.all(np.abs(new_sigma - sigma) <= tol)
+            sigma = new_sigma
+            if converged:
+                break
+
+    # A price at the intrinsic value can be rounded to just below it.
+    lowest_price = min_price * (1 - 4 * sys.float_info.epsilon)
+    sigma[prices <= min_price] = 0.0
+    sigma[(prices < lowest_price) | (prices > max_price)] = np.nan
+    return sigma
 
-    # The default method 'brentq' should suffice for this purpose.
-    return spOpt.root_scalar(price_from_vol, bracket=(0, 4))
+
+def _price_and_vega(
+        sigma,
+        sign,
+        log_moneyness,
+        sqrt_tau,
+        discounted_stock,
+        discounted_strike
+):
+    """
+    Vectorized BSM prices and vegas (per unit of vol).
+
+    The arguments are as in _price, with the volatility and square root of the
+    time to maturity given separately.
+    """
+    price, d1 = _price(sigma * sqrt_tau, sign, log_moneyness,
+                       discounted_stock, discounted_strike)
+    vega = discounted_stock * _INV_SQRT_2PI * np.exp(-d1 * d1 / 2) * sqrt_tau
+    return (price, vega)
+
+
+def _price(
+        scaled_vol,
+        sign,
+        log_moneyness,
+        discounted_stock,
+        discounted_strike
+):
+    """
+    Vectorized BSM prices, d1 is returned as well.
+
+    The sign is 1 for calls and -1 for puts, log_moneyness is the log of the
+    discounted stock over the discounted strike.
+    """
+    d1 = log_moneyness / scaled_vol + scaled_vol / 2
+    d2 = d1 - scaled_vol
+    price = sign * (discounted_stock * ndtr(sign * d1) -
+                    discounted_strike * ndtr(sign * d2))
+    return (price, d1)
 
 
 @dataclass(frozen=True)
@@ -68,49 +220,102 @@ class BSMOption():
         if self.sigma < 0.0:
             raise ValueError('sigma should be positive')
 
+    @staticmethod
+    def fair_value_batch(
+            spot,
+            strike,
+            tau,
+            sigma,
+            discount_rate,
+            dividend_yield,
+            dtype=np.float64
+    ):
+        """
+        Calculates the fair values of many options under the BSM-model.
+
+        The arguments are broadcast against each other, returns a tuple with an
+        array of call values and an array of put values. All calculations are
+        done in dtype, pass np.float32 to halve the memory traffic for large
+        batches.
+        """
+        spot, strike, tau, sigma, discount_rate, dividend_yield = \
+                np.broadcast_arrays(*(np.asarray(arg, dtype=dtype)
+                                      for arg in (spot, strike, tau, sigma,
+                                                  discount_rate,
+                                                  dividend_yield)))
+        if np.any(spot < 0.0):
+            raise ValueError('Spot should be positive')
+        if np.any(strike < 0.0):
+            raise ValueError('Strike should be positive')
+        if np.any(tau < 0.0):
+            raise ValueError('tau should be positive')
+        if np.any(sigma < 0.0):
+            raise ValueError('sigma should be positive')
+
+        scaled_vol = sigma * np.sqrt(tau)
+        discounted_stock = np.exp(-dividend_yield * tau) * spot
+        discounted_strike = np.exp(-discount_rate * tau) * strike
+        with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+            # Near the money, log1p keeps the precision of the log moneyness
+            # which matters most in single precision.
+            relative_moneyness = (spot - strike) / strike
+            log_moneyness = np.where(
+                np.abs(relative_moneyness) < 0.1, np.log1p(relative_moneyness),
+                np.log(spot) - np.log(strike))
+            log_moneyness += (discount_rate - dividend_yield) * tau
+            call = _price(scaled_vol, 1, log_moneyness, discounted_stock,
+                          discounted_strike)[0]
+            put = _price(scaled_vol, -1, log_moneyness, discounted_stock,
+                         discounted_strike)[0]
+
+        # Where the volatility is zero, the option price is equal to its
+        # intrinsic value at maturity, as in fair_value.
+        degenerate = (scaled_vol == 0) | (strike == 0) | (spot == 0)
+        intrinsic_value = discounted_stock - discounted_strike
+        return (np.where(degenerate, np.maximum(intrinsic_value, 0), call),
+                np.where(degenerate, np.maximum(-intrinsic_value, 0), put))
+
     def fair_value(self):
         """Calculates the fair value under the BSM-model."""
+        # All intermediate quantities are computed once and shared.
+        scaled_vol = self._scaled_vol()
+        discounted_stock = self._dividend_discount() * self.spot
+        discounted_strike = self._discount() * self.strike
         # If the volatility is zero, the option price is equal to its intrinsic
         # value at maturity.
-        if self.sigma == 0 or \
-                self.tau == 0 or \
-                self.strike == 0 or \
-                self.spot == 0:
-            discounted_stock = self._dividend_discount() * self.spot
-            discounted_strike = self._discount() * self.strike
+        if scaled_vol == 0 or self.strike == 0 or self.spot == 0:
             intrinsic_value = discounted_stock - discounted_strike
             return (max(intrinsic_value, 0), max(-intrinsic_value, 0))
-        return (self.spot * self._call_delta() - \
-                     self._discount() * self.strike * norm.cdf(self._d2()),
-                self._discount() * self.strike * norm.cdf(-self._d2()) - \
-                     self.spot * -self._put_delta())
+        if _bsm_ext is not None:
+            return _bsm_ext.fair_value(self.spot, self.strike, self.tau,
+                                       self.sigma, self.discount_rate,
+                                       self.dividend_yield)
+        d1 = self._d1(scaled_vol)
+        d2 = d1 - scaled_vol
+        return (discounted_stock * ndtr(d1) - discounted_strike * ndtr(d2),
+                discounted_strike * ndtr(-d2) - discounted_stock * ndtr(-d1))
 
     def delta(self):
         """Calculates the delta under the BSM-model."""
         # The underlying must be allowed to vary for delta to make sense.
-        if self.sigma == 0 or self.tau == 0 or self.spot == 0:
+        scaled_vol = self._scaled_vol()
+        if scaled_vol == 0 or self.spot == 0:
             return (float('NaN'), float('NaN'))
         if self.strike == 0:
             return (1, 0)
-        return (self._call_delta(), self._put_delta())
+        dividend_discount = self._dividend_discount()
+        d1 = self._d1(scaled_vol)
+        return (dividend_discount * ndtr(d1), -dividend_discount * ndtr(-d1))
 
     def vega(self):
         """Calculates the vega under the BSM-model."""
-        return self.spot * self._dividend_discount() * norm.pdf(self._d1()) * \
-                math.sqrt(self.tau) / 100
-
-    def _call_delta(self):
-        return self._dividend_discount() * norm.cdf(self._d1())
+        d1 = self._d1(self._scaled_vol())
+        return self.spot * self._dividend_discount() * _INV_SQRT_2PI * \
+                math.exp(-d1 * d1 / 2) * math.sqrt(self.tau) / 100
 
-    def _put_delta(self):
-        return -self._dividend_discount() * norm.cdf(-self._d1())
-
-    def _d1(self):
+    def _d1(self, scaled_vol):
         numerator = self._log_moneyness() + self._q_drift() * self.tau
-        return numerator / self._scaled_vol()
-
-    def _d2(self):
-        return self._d1() - self._scaled_vol()
+        return numerator / scaled_vol
 
     def _q_drift(self):
         return self.discount_rate - self.dividend_yield + self.sigma ** 2 / 2
@@ -119,7 +324,8 @@ class BSMOption():
         return self.sigma * math.sqrt(self.tau)
 
     def _log_moneyness(self):
-        return math.log(self.spot / self.strike)
+        # Taking logs separately avoids under- or overflow of the ratio.
+        return math.log(self.spot) - math.log(self.strike)
 
     def _dividend_discount(self):
         return math.exp(-self.dividend_yield * self.tau)
@@ -0,0 +1,514 @@
+"""
+Implied volatility using the method of "Let's Be Rational" by Peter Jaeckel.
+
+The implied volatility is found from a rational guess in a transformed price
+space followed by at most two Householder (third order) iterations, giving
+close to machine precision in a fixed amount of work. Where the Black formula
+cancels, for small scaled vols, the normalised price is evaluated with the
+asymptotic and small t expansions of the reference implementation.
+
+Prices are normalised by the square root of the forward times the strike and
+moneyness is expressed as x = ln(F / K), volatility is scaled by sqrt(T). The
+side of the option is passed as theta, 1 for calls and -1 for puts.
+"""
+
+import math
+import sys
+from scipy.special import erfcx, ndtr, ndtri
+
+
+DBL_EPSILON = sys.float_info.epsilon
+DBL_MIN = sys.float_info.min
+DBL_MAX = sys.float_info.max
+SQRT_DBL_MIN = math.sqrt(DBL_MIN)
+SQRT_DBL_MAX = math.sqrt(DBL_MAX)
+FOURTH_ROOT_DBL_EPSILON = math.sqrt(math.sqrt(DBL_EPSILON))
+SIXTEENTH_ROOT_DBL_EPSILON = math.sqrt(math.sqrt(FOURTH_ROOT_DBL_EPSILON))
+
+ONE_OVER_SQRT_TWO = 1 / math.sqrt(2)
+ONE_OVER_SQRT_TWO_PI = 1 / math.sqrt(2 * math.pi)
+SQRT_PI_OVER_TWO = math.sqrt(math.pi / 2)
+SQRT_THREE = math.sqrt(3)
+SQRT_ONE_OVER_THREE = math.sqrt(1 / 3)
+TWO_PI_OVER_SQRT_TWENTY_SEVEN = 2 * math.pi / math.sqrt(27)
+PI_OVER_SIX = math.pi / 6
+
+# Returned when the price is below the intrinsic value or above its maximum.
+VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_BELOW_INTRINSIC = -DBL_MAX
+VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM = DBL_MAX
+
+_MINIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER = -(1 - math.sqrt(DBL_EPSILON))
+_MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER = 2 / (DBL_EPSILON * DBL_EPSILON)
+_DEFAULT_ITERATIONS = 2
+# Below h = x / s = -10 the asymptotic expansion of the normalised Black price
+# is accurate to machine precision, above it and below t = s / 2 = 0.21 the
+# small t expansion is.
+_ASYMPTOTIC_EXPANSION_ACCURACY_THRESHOLD = -10.0
+_ASYMPTOTIC_EXPANSION_ORDER = 17
+_SMALL_T_EXPANSION_THRESHOLD = 2 * SIXTEENTH_ROOT_DBL_EPSILON
+
+
+def implied_volatility_from_a_transformed_rational_guess(
+        price: float,
+        forward: float,
+        strike: float,
+        tau: float,
+        theta: float,
+        iterations: int = _DEFAULT_ITERATIONS
+):
+    """
+    Find the Black implied volatility of an undiscounted option price.
+
+    Returns VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_BELOW_INTRINSIC or
+    VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM if the price can't be
+    attained.
+    """
+    intrinsic = max(theta * (forward - strike), 0.0)
+    if price < intrinsic:
+        return VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_BELOW_INTRINSIC
+    max_price = strike if theta < 0 else forward
+    if price >= max_price:
+        return VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM
+    x = math.log(forward / strike)
+    # Map in the money options to out of the money options.
+    if theta * x > 0:
+        price = max(price - intrinsic, 0.0)
+        theta = -theta
+    return normalised_implied_volatility(
+        price / (math.sqrt(forward) * math.sqrt(strike)), x, theta,
+        iterations) / math.sqrt(tau)
+
+
+def normalised_implied_volatility(
+        beta: float,
+        x: float,
+        theta: float,
+        iterations: int = _DEFAULT_ITERATIONS
+):
+    """Find the normalised volatility s = sigma * sqrt(T) of a normalised price."""
+    # Subtract the intrinsic value and map puts to calls, afterwards the
+    # option is an out of the money call with x <= 0.
+    if theta * x > 0:
+        beta = max(beta - normalised_intrinsic(x, theta), 0.0)
+        theta = -theta
+    if theta < 0:
+        x = -x
+    if beta <= 0:
+        return 0.0
+    b_max = math.exp(x / 2)
+    if beta >= b_max:
+        return VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM
+
+    # The price as a function of s has an inflection point at s_c, the
+    # tangent there defines the bounds s_l and s_h of four branches.
+    s_c = math.sqrt(abs(2 * x))
+    b_c = normalised_black_call(x, s_c)
+    v_c = normalised_vega(x, s_c)
+    if beta < b_c:
+        s_l = s_c - b_c / v_c
+        b_l = normalised_black_call(x, s_l)
+        if beta < b_l:
+            return _lower_branch(beta, x, s_l, b_l, iterations)
+        v_l = normalised_vega(x, s_l)
+        r_lm = _convex_control_parameter_right_side(
+            b_l, b_c, s_l, s_c, 1 / v_l, 1 / v_c, 0.0, False)
+        s = _rational_cubic_interpolation(
+            beta, b_l, b_c, s_l, s_c, 1 / v_l, 1 / v_c, r_lm)
+        s_left, s_right = s_l, s_c
+    else:
+        s_h = s_c + (b_max - b_c) / v_c if v_c > DBL_MIN else s_c
+        b_h = normalised_black_call(x, s_h)
+        if beta > b_h:
+            return _upper_branch(beta, x, s_h, b_h, b_max, iterations)
+        v_h = normalised_vega(x, s_h)
+        r_hm = _convex_control_parameter_left_side(
+            b_c, b_h, s_c, s_h, 1 / v_c, 1 / v_h, 0.0, False)
+        s = _rational_cubic_interpolation(
+            beta, b_c, b_h, s_c, s_h, 1 / v_c, 1 / v_h, r_hm)
+        s_left, s_right = s_c, s_h
+
+    # Householder iterations on the objective g(s) = b(x, s) - beta.
+    def step(s, b, vega):
+        newton = (beta - b) / vega
+        halley = (x / s) ** 2 / s - s / 4
+        hh3 = halley * halley - 3 * (x / (s * s)) ** 2 - 0.25
+        return newton * _householder_factor(newton, halley, hh3)
+    return _householder_iterations(
+        beta, x, s, s_left, s_right, iterations, step, lambda b: b > 0)
+
+
+def _lower_branch(beta, x, s_l, b_l, iterations):
+    """Guess and refine s for prices below b_l, in the lower map space."""
+    f_l, d_f_l, d2_f_l = _f_lower_map_and_first_two_derivatives(x, s_l)
+    r_ll = _convex_control_parameter_right_side(
+        0.0, b_l, 0.0, f_l, 1.0, d_f_l, d2_f_l, True)
+    f = _rational_cubic_interpolation(beta, 0.0, b_l, 0.0, f_l, 1.0, d_f_l,
+                                      r_ll)
+    if not f > 0:
+        # Fall back to quadratic interpolation.
+        t = beta / b_l
+        f = (f_l * t + b_l * (1 - t)) * t
+    if not f > 0:
+        # Underflow for the smallest prices, the map has slope 1 at zero.
+        f = beta
+    s = _inverse_f_lower_map(x, f)
+    ln_beta = math.log(beta)
+
+    # Householder iterations on the objective g(s) = 1 / ln(b) - 1 / ln(beta).
+    def step(s, b, vega):
+        ln_b = math.log(b)
+        bpob = vega / b
+        h = x / s
+        b_halley = h * h / s - s / 4
+        newton = (ln_beta - ln_b) * ln_b / ln_beta / bpob
+        halley = b_halley - bpob * (1 + 2 / ln_b)
+        b_hh3 = b_halley * b_halley - 3 * (h / s) ** 2 - 0.25
+        hh3 = b_hh3 + 2 * bpob * bpob * (1 + 3 / ln_b * (1 + 1 / ln_b)) - \
+                3 * b_halley * bpob * (1 + 2 / ln_b)
+        return newton * _householder_factor(newton, halley, hh3)
+    return _householder_iterations(
+        beta, x, s, DBL_MIN, s_l, iterations, step, lambda b: b > 0)
+
+
+def _upper_branch(beta, x, s_h, b_h, b_max, iterations):
+    """Guess and refine s for prices above b_h, in the upper map space."""
+    f_h, d_f_h, d2_f_h = _f_upper_map_and_first_two_derivatives(x, s_h)
+    f = -DBL_MAX
+    if -SQRT_DBL_MAX < d2_f_h < SQRT_DBL_MAX:
+        r_hh = _convex_control_parameter_left_side(
+            b_h, b_max, f_h, 0.0, d_f_h, -0.5, d2_f_h, True)
+        f = _rational_cubic_interpolation(beta, b_h, b_max, f_h, 0.0, d_f_h,
+                                          -0.5, r_hh)
+    if f <= 0:
+        # Fall back to quadratic interpolation.
+        h = b_max - b_h
+        t = (beta - b_h) / h
+        f = (f_h * (1 - t) + 0.5 * h * t) * (1 - t)
+    s = _inverse_f_upper_map(f)
+
+    if beta > b_max / 2:
+        # Householder iterations on g(s) = ln((b_max - beta) / (b_max - b)).
+        def step(s, b, vega):
+            b_max_minus_b = b_max - b
+            g = math.log((b_max - beta) / b_max_minus_b)
+            gp = vega / b_max_minus_b
+            b_halley = (x / s) ** 2 / s - s / 4
+            b_hh3 = b_halley * b_halley - 3 * (x / (s * s)) ** 2 - 0.25
+            newton = -g / gp
+            halley = b_halley + gp
+            hh3 = b_hh3 + gp * (2 * gp + 3 * b_halley)
+            return newton * _householder_factor(newton, halley, hh3)
+        return _householder_iterations(
+            beta, x, s, s_h, DBL_MAX, iterations, step, lambda b: b < b_max)
+
+    def step_price(s, b, vega):
+        newton = (beta - b) / vega
+        halley = (x / s) ** 2 / s - s / 4
+        hh3 = halley * halley - 3 * (x / (s * s)) ** 2 - 0.25
+        return newton * _householder_factor(newton, halley, hh3)
+    return _householder_iterations(
+        beta, x, s, s_h, DBL_MAX, iterations, step_price, lambda b: b > 0)
+
+
+def _householder_iterations(beta, x, s, s_left, s_right, iterations, step,
+                            is_valid):
+    """
+    Refine s using Householder steps, safeguarded by bisection.
+
+    The bracket [s_left, s_right] is narrowed as prices are evaluated. If a
+    step leaves the bracket or the steps change direction three times,
+    bisection is used instead.
+    """
+    ds = -DBL_MAX
+    ds_previous = 0.0
+    direction_reversal_count = 0
+    iteration = 0
+    while iteration < iterations and abs(ds) > DBL_EPSILON * s:
+        # Compare signs, multiplying would overflow for the initial ds.
+        if ds != 0 and ds_previous != 0 and (ds > 0) != (ds_previous > 0):
+            direction_reversal_count += 1
+        if iteration > 0 and (direction_reversal_count == 3 or
+                              not s_left < s < s_right):
+            s = (s_left + s_right) / 2
+            if s_right - s_left <= DBL_EPSILON * s:
+                break
+            direction_reversal_count = 0
+            ds = 0.0
+        ds_previous = ds
+        b = normalised_black_call(x, s)
+        vega = normalised_vega(x, s)
+        if b > beta and s < s_right:
+            s_right = s
+        elif b < beta and s > s_left:
+            s_left = s
+        if is_valid(b) and vega > 0:
+            ds = step(s, b, vega)
+        else:
+            ds = (s_left + s_right) / 2 - s
+        ds = max(-s / 2, ds)
+        s += ds
+        iteration += 1
+    return s
+
+
+def normalised_intrinsic(x: float, theta: float):
+    """The normalised intrinsic value."""
+    if theta * x <= 0:
+        return 0.0
+    x2 = x * x
+    # Use a series expansion of 2 * sinh(x / 2) for small x.
+    if x2 < 98 * FOURTH_ROOT_DBL_EPSILON:
+        return max(theta * x * (
+            1 + x2 * (1 / 24 + x2 * (1 / 1920 + x2 / 322560))), 0.0)
+    b_max = math.exp(x / 2)
+    return max(theta * (b_max - 1 / b_max), 0.0)
+
+
+def normalised_black_call(x: float, s: float):
+    """
+    The normalised Black call price.
+
+    Equal to exp(x / 2) * N(x / s + s / 2) - exp(-x / 2) * N(x / s - s / 2).
+    """
+    if x > 0:
+        # Use put-call parity to map to an out of the money option.
+        return normalised_intrinsic(x, 1) + normalised_black_call(-x, s)
+    if s <= 0:
+        return normalised_intrinsic(x, 1)
+    h = x / s
+    t = s / 2
+    # The difference below cancels for small t relative to |h|.
+    if h < _ASYMPTOTIC_EXPANSION_ACCURACY_THRESHOLD and h + t < \
+            _ASYMPTOTIC_EXPANSION_ACCURACY_THRESHOLD + \
+            _SMALL_T_EXPANSION_THRESHOLD:
+        return _asymptotic_expansion_of_normalised_black_call(h, t)
+    if t < _SMALL_T_EXPANSION_THRESHOLD:
+        return _small_t_expansion_of_normalised_black_call(h, t)
+    if h + t <= 0:
+        # Both terms are small, extract the common factor exp(-(h^2 + t^2) / 2)
+        # using the scaled complementary error function to avoid underflow.
+        return 0.5 * math.exp(-0.5 * (h * h + t * t)) * (
+            erfcx(-(h + t) * ONE_OVER_SQRT_TWO) -
+            erfcx(-(h - t) * ONE_OVER_SQRT_TWO))
+    return math.exp(x / 2) * ndtr(h + t) - math.exp(-x / 2) * ndtr(h - t)
+
+
+def _asymptotic_expansion_of_normalised_black_call(h, t):
+    """
+    The normalised Black call price for h = x / s below -10 and h + t < 0.
+
+    With Y(z) = N(z) / n(z), the price is n(0) * exp(-(h^2 + t^2) / 2) times
+    Y(h + t) - Y(h - t). Using the asymptotic series of Y for large negative
+    arguments, the difference is t / r times a series in q = (h / r)^2 with
+    coefficients that are polynomials in e = (t / h)^2, where r = (h + t)(h - t).
+    """
+    e = (t / h) ** 2
+    r = (h + t) * (h - t)
+    q = (h / r) ** 2
+    total = 0.0
+    q_power = 1.0
+    # The (2k - 1)!! of the asymptotic series of Y, with alternating signs.
+    double_factorial = 1.0
+    for k in range(_ASYMPTOTIC_EXPANSION_ORDER + 1):
+        n = 2 * k + 1
+        polynomial = 0.0
+        for i in range(k, -1, -1):
+            polynomial = polynomial * e + math.comb(n, 2 * i + 1)
+        total += 2 * double_factorial * polynomial * q_power
+        q_power *= q
+        double_factorial *= -n
+    # The price can be subnormal, take the factors into the exponent so it's
+    # rounded only once.
+    return math.exp(-0.5 * (h * h + t * t) +
+                    math.log(ONE_OVER_SQRT_TWO_PI * (t / r) * total))
+
+
+def _small_t_expansion_of_normalised_black_call(h, t):
+    """
+    The normalised Black call price for h = x / s <= 0 and small t = s / 2.
+
+    With Y(z) = N(z) / n(z), the price is n(0) * exp(-(h^2 + t^2) / 2) times
+    Y(h + t) - Y(h - t), of which the Taylor expansion in t to twelfth order
+    is used.
+    """
+    # Y(h) = sqrt(pi / 2) * erfcx(-h / sqrt(2)) and a = 1 + h * Y(h) > 0.
+    a = 1 + h * SQRT_PI_OVER_TWO * erfcx(-ONE_OVER_SQRT_TWO * h)
+    w = t * t
+    h2 = h * h
+    expansion = 2 * t * (a + w * (
+        (-1 + 3 * a + a * h2) / 6 + w * (
+            (-7 + 15 * a + h2 * (-1 + 10 * a + a * h2)) / 120 + w * (
+                (-57 + 105 * a + h2 * (
+                    -18 + 105 * a + h2 * (-1 + 21 * a + a * h2))) / 5040 +
+                w * (
+                    (-561 + 945 * a + h2 * (
+                        -285 + 1260 * a + h2 * (
+                            -33 + 378 * a + h2 * (
+                                -1 + 36 * a + a * h2)))) / 362880 +
+                    w * (
+                        (-6555 + 10395 * a + h2 * (
+                            -4680 + 17325 * a + h2 * (
+                                -840 + 6930 * a + h2 * (
+                                    -52 + 990 * a + h2 * (
+                                        -1 + 55 * a + a * h2))))) /
+                        39916800 +
+                        (-89055 + 135135 * a + h2 * (
+                            -82845 + 270270 * a + h2 * (
+                                -20370 + 135135 * a + h2 * (
+                                    -1926 + 25740 * a + h2 * (
+                                        -75 + 2145 * a + h2 * (
+                                            -1 + 78 * a + a * h2)))))) *
+                        w / 6227020800))))))
+    return max(ONE_OVER_SQRT_TWO_PI * math.exp(-0.5 * (h * h + t * t)) *
+               expansion, 0.0)
+
+
+def normalised_vega(x: float, s: float):
+    """The derivative of the normalised Black price with respect to s."""
+    ax = abs(x)
+    if ax <= 0:
+        return ONE_OVER_SQRT_TWO_PI * math.exp(-0.125 * s * s)
+    if s <= 0 or s <= ax * SQRT_DBL_MIN:
+        return 0.0
+    return ONE_OVER_SQRT_TWO_PI * math.exp(-0.5 * ((x / s) ** 2 + (s / 2) ** 2))
+
+
+def _householder_factor(newton, halley, hh3):
+    return (1 + 0.5 * halley * newton) / \
+            (1 + newton * (halley + hh3 * newton / 6))
+
+
+def _f_lower_map_and_first_two_derivatives(x, s):
+    """The lower map f(beta) and its derivatives with respect to beta."""
+    ax = abs(x)
+    z = SQRT_ONE_OVER_THREE * ax / s
+    y = z * z
+    s2 = s * s
+    Phi = ndtr(-z)
+    phi = ONE_OVER_SQRT_TWO_PI * math.exp(-y / 2)
+    fpp = PI_OVER_SIX * y / (s2 * s) * Phi * (
+        8 * SQRT_THREE * s * ax + (3 * s2 * (s2 - 8) - 8 * x * x) * Phi / phi
+        ) * math.exp(2 * y + 0.25 * s2)
+    if abs(s) < DBL_MIN:
+        fp = 1.0
+        f = 0.0
+    else:
+        Phi2 = Phi * Phi
+        fp = 2 * math.pi * y * Phi2 * math.exp(y + 0.125 * s2)
+        f = 0.0 if ax < DBL_MIN else \
+                TWO_PI_OVER_SQRT_TWENTY_SEVEN * ax * (Phi2 * Phi)
+    return (f, fp, fpp)
+
+
+def _inverse_f_lower_map(x, f):
+    # Subnormal values of f are still inverted, prices that small map to
+    # small but positive vols.
+    if f <= 0:
+        return 0.0
+    # Taking the cube roots first avoids underflow of the quotient.
+    return abs(x / (SQRT_THREE * ndtri(
+        f ** (1 / 3) / (TWO_PI_OVER_SQRT_TWENTY_SEVEN * abs(x)) ** (1 / 3))))
+
+
+def _f_upper_map_and_first_two_derivatives(x, s):
+    """The upper map f(beta) and its derivatives with respect to beta."""
+    f = ndtr(-s / 2)
+    if abs(x) < DBL_MIN:
+        return (f, -0.5, 0.0)
+    w = (x / s) ** 2
+    fp = -0.5 * math.exp(w / 2)
+    fpp = SQRT_PI_OVER_TWO * math.exp(w + 0.125 * s * s) * w / s
+    return (f, fp, fpp)
+
+
+def _inverse_f_upper_map(f):
+    return -2 * ndtri(f)
+
+
+def _rational_cubic_interpolation(x, x_l, x_r, y_l, y_r, d_l, d_r, r):
+    """Interpolate using a rational cubic with control parameter r."""
+    h = x_r - x_l
+    if abs(h) <= 0:
+        return (y_l + y_r) / 2
+    t = (x - x_l) / h
+    if r >= _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER:
+        return y_r * t + y_l * (1 - t)
+    omt = 1 - t
+    t2 = t * t
+    omt2 = omt * omt
+    return (y_r * t2 * t + (r * y_r - h * d_r) * t2 * omt +
+            (r * y_l + h * d_l) * t * omt2 + y_l * omt2 * omt) / \
+            (1 + (r - 3) * t * omt)
+
+
+def _control_parameter_left_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                 second_derivative_l):
+    h = x_r - x_l
+    numerator = 0.5 * h * second_derivative_l + (d_r - d_l)
+    if abs(numerator) < DBL_MIN:
+        return 0.0
+    denominator = (y_r - y_l) / h - d_l
+    if abs(denominator) < DBL_MIN:
+        return _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER if numerator > 0 \
+                else _MINIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    return numerator / denominator
+
+
+def _control_parameter_right_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                  second_derivative_r):
+    h = x_r - x_l
+    numerator = 0.5 * h * second_derivative_r + (d_r - d_l)
+    if abs(numerator) < DBL_MIN:
+        return 0.0
+    denominator = d_r - (y_r - y_l) / h
+    if abs(denominator) < DBL_MIN:
+        return _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER if numerator > 0 \
+                else _MINIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    return numerator / denominator
+
+
+def _minimum_control_parameter(d_l, d_r, s, prefer_shape_preservation):
+    """The smallest control parameter preserving monotonicity and convexity."""
+    monotonic = d_l * s >= 0 and d_r * s >= 0
+    convex = d_l <= s <= d_r
+    concave = d_l >= s >= d_r
+    if not (monotonic or convex or concave):
+        return _MINIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    d_r_m_d_l = d_r - d_l
+    d_r_m_s = d_r - s
+    s_m_d_l = s - d_l
+    r1 = -DBL_MAX
+    r2 = -DBL_MAX
+    if monotonic:
+        if abs(s) > 0:
+            r1 = (d_r + d_l) / s
+        elif prefer_shape_preservation:
+            r1 = _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    if convex or concave:
+        if abs(s_m_d_l) >= DBL_MIN and abs(d_r_m_s) >= DBL_MIN:
+            r2 = max(abs(d_r_m_d_l / d_r_m_s), abs(d_r_m_d_l / s_m_d_l))
+        elif prefer_shape_preservation:
+            r2 = _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    elif monotonic and prefer_shape_preservation:
+        r2 = _MAXIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER
+    return max(_MINIMUM_RATIONAL_CUBIC_CONTROL_PARAMETER, r1, r2)
+
+
+def _convex_control_parameter_left_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                        second_derivative_l,
+                                        prefer_shape_preservation):
+    r = _control_parameter_left_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                     second_derivative_l)
+    r_min = _minimum_control_parameter(d_l, d_r, (y_r - y_l) / (x_r - x_l),
+                                       prefer_shape_preservation)
+    return max(r, r_min)
+
+
+def _convex_control_parameter_right_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                         second_derivative_r,
+                                         prefer_shape_preservation):
+    r = _control_parameter_right_side(x_l, x_r, y_l, y_r, d_l, d_r,
+                                      second_derivative_r)
+    r_min = _minimum_control_parameter(d_l, d_r, (y_r - y_l) / (x_r - x_l),
+                                       prefer_shape_preservation)
+    return max(r, r_min)
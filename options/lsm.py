@@ -5,31 +5,45 @@ Based on "Valuing American Options by Simulation: A Simple Least Squares
 Approach" by Francis A. Longstaff and Eduardo S. Schwartz.
 """
 
+from collections import namedtuple
 import math
 import numpy as np
-from scipy import stats
-import statsmodels.api as sm
+from numba import njit, prange
+from scipy import linalg, stats
 
 import bsm
 import gbm
 
-# Paths as in the first example.
-EXAMPLE_PATHS = np.reshape(np.ravel(np.transpose(np.matrix(
-        """1.00 1.09 1.08 1.34;
-           1.00 1.16 1.26 1.54;
-           1.00 1.22 1.07 1.03;
-           1.00 0.93 0.97 0.92;
-           1.00 1.11 1.56 1.52;
-           1.00 0.76 0.77 0.90;
-           1.00 0.92 0.84 1.01;
-           1.00 0.88 1.22 1.34"""))), (4, 8))
+# Paths as in the first example, stored with one column per path.
+EXAMPLE_PATHS = np.array([
+    [1.00, 1.09, 1.08, 1.34],
+    [1.00, 1.16, 1.26, 1.54],
+    [1.00, 1.22, 1.07, 1.03],
+    [1.00, 0.93, 0.97, 0.92],
+    [1.00, 1.11, 1.56, 1.52],
+    [1.00, 0.76, 0.77, 0.90],
+    [1.00, 0.92, 0.84, 1.01],
+    [1.00, 0.88, 1.22, 1.34]]).T
+
+# The result of a regression, only the fitted values are used by the LSM
+# method.
+Fit = namedtuple('Fit', ['fittedvalues', 'coefficients'])
 
 def lsm(paths, payoff_fun, regress_fun, discount_rate, T, strike):
-    """Implement the LSM method."""
+    """
+    Implement the LSM method.
+
+    The calculations are done in the floating point type of the payoffs,
+    integer payoffs are promoted to double precision.
+    """
+    paths = np.asarray(paths)
     number_of_steps, number_of_paths = np.shape(paths)
     intrinsic_value = payoff_fun(paths)
-    realized_cash_flows = intrinsic_value[-1, :]
-    cash_flows = [realized_cash_flows]
+    dtype = np.result_type(intrinsic_value.dtype, np.float32)
+    # Row k holds the cash flows at time k + 1, no cash flows occur at time 0.
+    cash_flows = np.zeros((number_of_steps - 1, number_of_paths), dtype=dtype)
+    cash_flows[-1] = intrinsic_value[-1, :]
+    realized_cash_flows = np.copy(cash_flows[-1])
     ols_fits = []
 
     # The algorithm steps backwards, the range here is forwards, all i's below
@@ -41,45 +55,35 @@ def lsm(paths, payoff_fun, regress_fun, discount_rate, T, strike):
         current_intrinsic_values = intrinsic_value[-i, :]
         in_money = current_intrinsic_values > 0
 
-        early_cash_flows = np.zeros(number_of_paths)
+        # The continuation value of out of the money paths is left at zero,
+        # they are never exercised as their intrinsic value is zero too.
+        continuation_values = np.zeros(number_of_paths, dtype=dtype)
         if np.any(in_money):
             ols_fit = regress_fun(
                 paths[-i, in_money] / strike,
                 realized_cash_flows[in_money] / strike)
             ols_fits.append(ols_fit)
-
-            # For the in the money paths, find those for which immediate
-            # exercise has higher value than continuing the option.
-            early_exercise = ols_fit.fittedvalues * strike < \
-                    current_intrinsic_values[in_money]
-            improvements = np.where(in_money)[0][early_exercise]
-            early_cash_flows[improvements] = \
-                    current_intrinsic_values[improvements]
+            continuation_values[in_money] = ols_fit.fittedvalues * strike
         else:
             ols_fits.append([])
 
+        # Exercise where immediate exercise has higher value than continuing
+        # the option, in a single pass over all paths.
+        early_cash_flows = np.where(
+            current_intrinsic_values > continuation_values,
+            current_intrinsic_values, 0.0).astype(dtype, copy=False)
+
         # Add the new set of cash flows, zero out cash flows if the option was
         # exercised and use the undiscounted expected cash flows for regression
         # in the next step.
-        (cash_flows, realized_cash_flows) = \
-                add_cash_flows(cash_flows, early_cash_flows)
+        add_cash_flows(cash_flows, realized_cash_flows, early_cash_flows,
+                       number_of_steps - i - 1)
 
     # The option value give the estimated stopping policy is just the expected
     # value of the discounted cash flows.
     value = npv(cash_flows, discount_rate / (number_of_steps / T))
     return (value, cash_flows, ols_fits)
 
-# Used as a polynomial basis in the regression.
-def l_0(x):
-    """The first Laguerre polynomial."""
-    return np.exp(-x/2)
-def l_1(x):
-    """The second Laguerre polynomial."""
-    return np.exp(-x/2) * (1 - x)
-def l_2(x):
-    """The third Laguerre polynomial."""
-    return np.exp(-x/2) * (1 - 2 * x + x ** 2 / 2)
-
 def american_put_payoff(strike):
     """Calculate the intrinsic values per path for an American Put."""
     def payoff_fun(values):
@@ -88,46 +92,72 @@ def american_put_payoff(strike):
 
 def regress_laguerre_2(stock_prices, cash_flows):
     """Perform the LSM regression."""
-    mat_x = np.column_stack((
-                np.ones(len(stock_prices)),
-                l_0(stock_prices),
-                l_1(stock_prices),
-                l_2(stock_prices)))
-    return sm.OLS(cash_flows, mat_x).fit()
+    mat_x = np.empty((len(stock_prices), 4), dtype=stock_prices.dtype)
+    _laguerre_basis(stock_prices, mat_x)
+    return least_squares(mat_x, cash_flows)
+
+@njit(cache=True)
+def _laguerre_basis(x, out):
+    """
+    Fill out with a constant and the first three Laguerre polynomials of x.
+
+    The polynomials share the factor exp(-x / 2), so a single exp is evaluated
+    per element in one pass over x.
+    """
+    for k in range(len(x)):
+        weight = math.exp(-x[k] / 2)
+        out[k, 0] = 1.0
+        out[k, 1] = weight
+        out[k, 2] = weight * (1 - x[k])
+        out[k, 3] = weight * (1 - 2 * x[k] + x[k] * x[k] / 2)
 
 def regress_linear(stock_prices, cash_flows):
     """Perform the LSM regression."""
-    mat_x = np.column_stack((
-                np.ones(len(stock_prices)),
-                stock_prices,
-                np.square(stock_prices)))
-    return sm.OLS(cash_flows, mat_x).fit()
-
-def add_cash_flows(cash_flows, early_cash_flows):
-    """Add cash flows for period to an existing set of cash flows."""
-    realized_cash_flows = np.copy(early_cash_flows)
-    is_stopped = early_cash_flows > 0.0
-
-    output = [early_cash_flows]
-    for vec in cash_flows:
+    mat_x = np.empty((len(stock_prices), 3), dtype=stock_prices.dtype)
+    mat_x[:, 0] = 1.0
+    mat_x[:, 1] = stock_prices
+    np.square(stock_prices, out=mat_x[:, 2])
+    return least_squares(mat_x, cash_flows)
+
+def least_squares(mat_x, y):
+    """Fit y on the columns of mat_x using ordinary least squares."""
+    # The design matrices are tall and thin, for which the QR based 'gelsy'
+    # driver is faster than the default SVD based 'gelsd'. The Laguerre
+    # columns are close to collinear, so single precision matrices are solved
+    # in double precision to avoid their rank being underestimated.
+    coefficients = linalg.lstsq(
+        mat_x.astype(np.float64, copy=False), y.astype(np.float64, copy=False),
+        lapack_driver='gelsy', check_finite=False)[0].astype(mat_x.dtype)
+    return Fit(mat_x @ coefficients, coefficients)
+
+@njit(parallel=True, cache=True)
+def add_cash_flows(cash_flows, realized_cash_flows, early_cash_flows, period):
+    """
+    Add cash flows for a period to an existing matrix of cash flows.
+
+    The rows of cash_flows correspond to periods. Both cash_flows and
+    realized_cash_flows are updated in place.
+    """
+    number_of_periods, number_of_paths = cash_flows.shape
+    for j in prange(number_of_paths):  # pylint: disable=not-an-iterable
+        cash_flows[period, j] = early_cash_flows[j]
         # Zero out cash flows made if the option was exercised earlier and
-        # create the Y vector for the regression.
-        vec[is_stopped] = 0.0
-        realized_cash_flows += vec
-        output.append(vec)
-
-    return (output, realized_cash_flows)
+        # update the Y vector for the regression. Each path has at most one
+        # nonzero cash flow, so the realized cash flow is simply replaced.
+        if early_cash_flows[j] > 0.0:
+            for k in range(period + 1, number_of_periods):
+                cash_flows[k, j] = 0.0
+            realized_cash_flows[j] = early_cash_flows[j]
 
 def npv(cash_flow_matrix, discount_rate):
     """Calculate the NPV of a set of cash flows given a discount factor."""
-    discounted_cash_flows = np.zeros(np.shape(cash_flow_matrix[0]))
-    discount_step = math.exp(-discount_rate)
-    discount_rate = discount_step
-    for cash_flows in cash_flow_matrix:
-        discounted_cash_flows += cash_flows * discount_rate
-        discount_rate *= discount_step
-
-    value = sum(discounted_cash_flows) / np.shape(cash_flow_matrix)[1]
+    # Row k of the matrix is discounted k + 1 periods.
+    discount_factors = np.exp(
+        -discount_rate * np.arange(1, np.shape(cash_flow_matrix)[0] + 1)
+    ).astype(cash_flow_matrix.dtype)
+    discounted_cash_flows = discount_factors @ cash_flow_matrix
+
+    value = np.mean(discounted_cash_flows)
     standard_error = stats.sem(discounted_cash_flows)
     return (value, standard_error)
 
@@ -156,7 +186,7 @@ def price_table(
                 per_path_value = np.maximum(strike - paths[-1], 0) * \
                         math.exp(-discount_rate * T)
                 output[key]['Simulated European Price'] = \
-                        sum(per_path_value) / number_of_paths
+                        per_path_value.mean()
                 output[key]['Simulated European SE'] = stats.sem(per_path_value)
 
                 lsm_result = lsm(
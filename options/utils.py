@@ -1,4 +1,5 @@
 """Helpers for the Prycing notebooks"""
+import numpy as np
 
 def gauss_first_formula(n):
     """Gauss first formula to sum the first n integers."""
@@ -7,38 +8,74 @@ def gauss_first_formula(n):
 class Tree():
     """Models a binomial tree."""
     def __init__(self, height, value=float('NaN')):
-        """Create a tree as a list filled with the value of value."""
+        """Create a tree as an array filled with the value of value."""
         if height < 0:
             raise ValueError('height should be nonnegative')
         self.height = height
-        self._nodes = [value] * gauss_first_formula(height)
+        self._nodes = np.full(gauss_first_formula(height), value,
+                              dtype=np.float64)
+        # The index of the first node on each level, the last entry is the
+        # total number of nodes.
+        self._offsets = gauss_first_formula(np.arange(height + 1, dtype=np.intp))
+
+    @classmethod
+    def from_nodes(cls, height, nodes):
+        """Create a tree from a sequence of nodes stored level by level."""
+        if height < 0:
+            raise ValueError('height should be nonnegative')
+        if len(nodes) != gauss_first_formula(height):
+            raise ValueError('number of nodes does not match height')
+        # Start from an empty tree to avoid filling nodes that are replaced.
+        tree = cls(0)
+        tree.height = height
+        tree._nodes = np.array(nodes, dtype=np.float64)
+        tree._offsets = gauss_first_formula(np.arange(height + 1, dtype=np.intp))
+        return tree
 
     def get_level(self, level):
         """Get all nodes on a certain level."""
         if level < 0:
             raise ValueError('level should be nonnegative')
 
-        last_node = gauss_first_formula(level)
-        if last_node > len(self._nodes):
+        if level > self.height:
             raise ValueError('tree lower than given level')
+        if level == 0:
+            return self._nodes[0:0]
 
-        return self._nodes[gauss_first_formula(level - 1):last_node]
+        return self._nodes[self._offsets[level - 1]:self._offsets[level]]
 
     def get_node(self, level, element):
         """Get the ith node from level"""
         if element > level:
             raise ValueError('element out of bounds')
-        return self._nodes[gauss_first_formula(level) + element]
+        return self._nodes[self._offsets[level] + element]
 
     def set_node(self, level, element, value):
         """Set an element in the tree by reference and returns it."""
         if element > level:
             raise ValueError('element out of bounds')
-        self._nodes[gauss_first_formula(level) + element] = value
+        self._nodes[self._offsets[level] + element] = value
+
+    def step_backward(self, level, discounted_q_u, discounted_q_d):
+        """
+        Fill the nodes on a level from the nodes on the level after it.
+
+        The levels are indexed as in get_node. Node j becomes the weighted sum
+        of nodes j and j + 1 on the next level, the updated level is returned.
+        """
+        if level < 0 or level >= self.height - 1:
+            raise ValueError('level should have a level after it')
+        start, end = self._offsets[level:level + 2]
+        next_level = self._nodes[end:self._offsets[level + 2]]
+        nodes = self._nodes[start:end]
+        np.multiply(discounted_q_u, next_level[:-1], out=nodes)
+        nodes += discounted_q_d * next_level[1:]
+        return nodes
 
     def __repr__(self):
         output = ""
         for i in range(0, self.height + 1):
             level = self.get_level(i)
-            output += "\n" + ', '.join(str(val) for val in reversed(level))
+            output += "\n" + ', '.join(np.format_float_positional(val, trim='-')
+                                        for val in reversed(level))
         return output
@@ -0,0 +1,15 @@
+"""
+Build the optional C extension of the BSM model in place with:
+
+    python setup.py build_ext --inplace
+
+Requires Cython and a C compiler.
+"""
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+setup(
+    name='Prycing',
+    ext_modules=cythonize(
+        [Extension('options._bsm_ext', ['options/_bsm_ext.pyx'])]),
+)
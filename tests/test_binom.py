@@ -1,7 +1,7 @@
 "Test the binomial tree code."""
 import unittest
 
-from Prycing.options.binom import Option, binom_option
+from Prycing.options.binom import Option, binom_option, binom_option_full
 
 #pylint: disable-msg=attribute-defined-outside-init
 class TestFairValue(unittest.TestCase):
@@ -41,3 +41,12 @@ class TestFairValue(unittest.TestCase):
         self.assertAlmostEqual(
             binom_option(self.call_option1, 0.06, 0, 0.4, 2, 1000)[1].get_node(0, 0),
             8.223, places=2)
+
+    def test_full_trees(self):
+        """Test that the full trees match the rolled back root."""
+        self.assertAlmostEqual(
+            binom_option_full(self.put_option1, 0.06, 0, 0.2, 1, 50)[1].get_node(0, 0),
+            binom_option(self.put_option1, 0.06, 0, 0.2, 1, 50)[1].get_node(0, 0))
+        stock_tree = binom_option_full(self.call_option1, 0.06, 0, 0.2, 1, 50)[0]
+        self.assertEqual(stock_tree.get_node(0, 0), 36)
+        self.assertAlmostEqual(stock_tree.get_node(2, 1), 36)
@@ -1,10 +1,12 @@
 """Test the BSM code."""
 import unittest
 from hypothesis import given
+from hypothesis.extra.numpy import arrays
 from hypothesis.strategies import floats
 import numpy as np
 
-from Prycing.options.bsm import BSMOption, find_implied_vol, OptionSide
+from Prycing.options.bsm import BSMOption, find_implied_vol, \
+        find_implied_vol_batch, find_implied_vol_vec, OptionSide, _bsm_ext
 
 class TestImpliedVol(unittest.TestCase):
     """Test the implied vol functionality."""
@@ -48,6 +50,31 @@ class TestImpliedVol(unittest.TestCase):
             ValueError,
             find_implied_vol, 0.001, OptionSide.Call, 100, 10, 1, 0, 0)
 
+    def test_vol_finder_vec(self):
+        """Recover several vols at once, out of range prices give NaN."""
+        spots = np.array([36, 40, 44, 100, 10, 100])
+        sigmas = np.array([0.2, 0.4, 0.1, 3.5, 0.3, 0.3])
+        sides = np.array([OptionSide.Call, OptionSide.Put, OptionSide.Call,
+                          OptionSide.Put, OptionSide.Call, OptionSide.Call])
+        prices = np.array([
+            BSMOption(spot, 40, 1.5, sigma, 0.06, 0.02).fair_value()[side]
+            for spot, sigma, side in zip(spots, sigmas, sides)])
+        prices[4] = 10
+        prices[5] = 0.001
+        vols = find_implied_vol_vec(prices, sides, spots, 40, 1.5, 0.06, 0.02)
+        np.testing.assert_allclose(vols[:4], sigmas[:4])
+        self.assertTrue(np.all(np.isnan(vols[4:])))
+
+        # At maturity only the intrinsic value can be attained.
+        vols = find_implied_vol_vec([1.0, 0.0, 2.0], OptionSide.Call, 40,
+                                    [40, 40, 38], 0, 0, 0)
+        self.assertTrue(np.isnan(vols[0]))
+        np.testing.assert_array_equal(vols[1:], [0.0, 0.0])
+        self.assertRaises(ValueError, find_implied_vol, 1.0, OptionSide.Call,
+                          40, 40, 0, 0, 0)
+        self.assertRaises(ValueError, find_implied_vol_batch, 1.0,
+                          OptionSide.Call, 40, 40, 0, 0, 0)
+
 
 class TestBSMOptionSanityChecks(unittest.TestCase):
     """Test that edge cases in BSMOptions are correctly handled."""
@@ -95,7 +122,8 @@ class TestGreeks(unittest.TestCase):
 
 class TestPutCallEquality(unittest.TestCase):
     """Test that C(S, K) == P(K, S) if rates are zero."""
-    @given(floats(0, 10), floats(0, 10), floats(0, 10), floats(0, 10))
+    @given(*(arrays(np.float64, 100, elements=floats(0, 10))
+             for _ in range(4)))
     def test_put_call_equality(
             self,
             spot,
@@ -103,98 +131,150 @@ class TestPutCallEquality(unittest.TestCase):
             time_to_maturity,
             sigma
         ):
-        """Implement the test using hypothesis."""
+        """Implement the test using hypothesis, on a batch of options."""
+        fair_value1 = BSMOption.fair_value_batch(
+            spot, strike, time_to_maturity, sigma, 0, 0)
+        fair_value2 = BSMOption.fair_value_batch(
+            strike, spot, time_to_maturity, sigma, 0, 0)
+        np.testing.assert_allclose(fair_value1[0], fair_value2[1], rtol=0,
+                                   atol=1e-7)
+        np.testing.assert_allclose(fair_value1[1], fair_value2[0], rtol=0,
+                                   atol=1e-7)
+
+        # The scalar implementation should agree with the batch and satisfy
+        # the same equality.
+        spot, strike, time_to_maturity, sigma = (
+            float(spot[0]), float(strike[0]), float(time_to_maturity[0]),
+            float(sigma[0]))
         option1 = BSMOption(spot, strike, time_to_maturity, sigma, 0, 0)
         option2 = BSMOption(strike, spot, time_to_maturity, sigma, 0, 0)
-        fair_value1 = option1.fair_value()
-        fair_value2 = option2.fair_value()
-        self.assertAlmostEqual(fair_value1[0], fair_value2[1])
-        self.assertAlmostEqual(fair_value1[1], fair_value2[0])
+        self.assertAlmostEqual(option1.fair_value()[0], fair_value1[0][0])
+        self.assertAlmostEqual(option1.fair_value()[1], fair_value1[1][0])
+        self.assertAlmostEqual(option1.fair_value()[0], option2.fair_value()[1])
+        self.assertAlmostEqual(option1.fair_value()[1], option2.fair_value()[0])
 
-#pylint: disable-msg=attribute-defined-outside-init
-#pylint: disable-msg=too-many-instance-attributes
 class TestFairValue(unittest.TestCase):
     """Test the pricing functionality of the BSM module."""
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """Setup the test class."""
-        self.option1 = BSMOption(36, 40, 1, 0.2, 0.06, 0)
-        self.option2 = BSMOption(36, 40, 2, 0.2, 0.06, 0)
-        self.option3 = BSMOption(36, 40, 1, 0.4, 0.06, 0)
-        self.option4 = BSMOption(36, 40, 2, 0.4, 0.06, 0)
-
-        self.option5 = BSMOption(38, 40, 1, 0.2, 0.06, 0)
-        self.option6 = BSMOption(38, 40, 2, 0.2, 0.06, 0)
-        self.option7 = BSMOption(38, 40, 1, 0.4, 0.06, 0)
-        self.option8 = BSMOption(38, 40, 2, 0.4, 0.06, 0)
-
-        self.option9 = BSMOption(40, 40, 1, 0.2, 0.06, 0)
-        self.option10 = BSMOption(40, 40, 2, 0.2, 0.06, 0)
-        self.option11 = BSMOption(40, 40, 1, 0.4, 0.06, 0)
-        self.option12 = BSMOption(40, 40, 2, 0.4, 0.06, 0)
-
-        self.option13 = BSMOption(42, 40, 1, 0.2, 0.06, 0)
-        self.option14 = BSMOption(42, 40, 2, 0.2, 0.06, 0)
-        self.option15 = BSMOption(42, 40, 1, 0.4, 0.06, 0)
-        self.option16 = BSMOption(42, 40, 2, 0.4, 0.06, 0)
-
-        self.option17 = BSMOption(44, 40, 1, 0.2, 0.06, 0)
-        self.option18 = BSMOption(44, 40, 2, 0.2, 0.06, 0)
-        self.option19 = BSMOption(44, 40, 1, 0.4, 0.06, 0)
-        self.option20 = BSMOption(44, 40, 2, 0.4, 0.06, 0)
+        cls.options = [
+            BSMOption(36, 40, 1, 0.2, 0.06, 0),
+            BSMOption(36, 40, 2, 0.2, 0.06, 0),
+            BSMOption(36, 40, 1, 0.4, 0.06, 0),
+            BSMOption(36, 40, 2, 0.4, 0.06, 0),
+
+            BSMOption(38, 40, 1, 0.2, 0.06, 0),
+            BSMOption(38, 40, 2, 0.2, 0.06, 0),
+            BSMOption(38, 40, 1, 0.4, 0.06, 0),
+            BSMOption(38, 40, 2, 0.4, 0.06, 0),
+
+            BSMOption(40, 40, 1, 0.2, 0.06, 0),
+            BSMOption(40, 40, 2, 0.2, 0.06, 0),
+            BSMOption(40, 40, 1, 0.4, 0.06, 0),
+            BSMOption(40, 40, 2, 0.4, 0.06, 0),
+
+            BSMOption(42, 40, 1, 0.2, 0.06, 0),
+            BSMOption(42, 40, 2, 0.2, 0.06, 0),
+            BSMOption(42, 40, 1, 0.4, 0.06, 0),
+            BSMOption(42, 40, 2, 0.4, 0.06, 0),
+
+            BSMOption(44, 40, 1, 0.2, 0.06, 0),
+            BSMOption(44, 40, 2, 0.2, 0.06, 0),
+            BSMOption(44, 40, 1, 0.4, 0.06, 0),
+            BSMOption(44, 40, 2, 0.4, 0.06, 0),
+        ]
+        # The fair values of option i are stored in fv[i], counting from 1.
+        cls.fv = {i: option.fair_value()
+                  for i, option in enumerate(cls.options, start=1)}
 
     def test_put_fair_value(self):
         """Test the fair values of puts. Values taken from LSM paper."""
-        self.assertAlmostEqual(self.option1.fair_value()[1], 3.844, places=3)
-        self.assertAlmostEqual(self.option2.fair_value()[1], 3.763, places=3)
-        self.assertAlmostEqual(self.option3.fair_value()[1], 6.711, places=3)
-        self.assertAlmostEqual(self.option4.fair_value()[1], 7.700, places=3)
-
-        self.assertAlmostEqual(self.option5.fair_value()[1], 2.852, places=3)
-        self.assertAlmostEqual(self.option6.fair_value()[1], 2.991, places=3)
-        self.assertAlmostEqual(self.option7.fair_value()[1], 5.834, places=3)
-        self.assertAlmostEqual(self.option8.fair_value()[1], 6.979, places=3)
-
-        self.assertAlmostEqual(self.option9.fair_value()[1], 2.066, places=3)
-        self.assertAlmostEqual(self.option10.fair_value()[1], 2.356, places=3)
-        self.assertAlmostEqual(self.option11.fair_value()[1], 5.060, places=3)
-        self.assertAlmostEqual(self.option12.fair_value()[1], 6.326, places=3)
-
-        self.assertAlmostEqual(self.option13.fair_value()[1], 1.465, places=3)
-        self.assertAlmostEqual(self.option14.fair_value()[1], 1.841, places=3)
-        self.assertAlmostEqual(self.option15.fair_value()[1], 4.379, places=3)
-        self.assertAlmostEqual(self.option16.fair_value()[1], 5.736, places=3)
-
-        self.assertAlmostEqual(self.option17.fair_value()[1], 1.017, places=3)
-        self.assertAlmostEqual(self.option18.fair_value()[1], 1.429, places=3)
-        self.assertAlmostEqual(self.option19.fair_value()[1], 3.783, places=3)
-        self.assertAlmostEqual(self.option20.fair_value()[1], 5.202, places=3)
+        self.assertAlmostEqual(self.fv[1][1], 3.844, places=3)
+        self.assertAlmostEqual(self.fv[2][1], 3.763, places=3)
+        self.assertAlmostEqual(self.fv[3][1], 6.711, places=3)
+        self.assertAlmostEqual(self.fv[4][1], 7.700, places=3)
+
+        self.assertAlmostEqual(self.fv[5][1], 2.852, places=3)
+        self.assertAlmostEqual(self.fv[6][1], 2.991, places=3)
+        self.assertAlmostEqual(self.fv[7][1], 5.834, places=3)
+        self.assertAlmostEqual(self.fv[8][1], 6.979, places=3)
+
+        self.assertAlmostEqual(self.fv[9][1], 2.066, places=3)
+        self.assertAlmostEqual(self.fv[10][1], 2.356, places=3)
+        self.assertAlmostEqual(self.fv[11][1], 5.060, places=3)
+        self.assertAlmostEqual(self.fv[12][1], 6.326, places=3)
+
+        self.assertAlmostEqual(self.fv[13][1], 1.465, places=3)
+        self.assertAlmostEqual(self.fv[14][1], 1.841, places=3)
+        self.assertAlmostEqual(self.fv[15][1], 4.379, places=3)
+        self.assertAlmostEqual(self.fv[16][1], 5.736, places=3)
+
+        self.assertAlmostEqual(self.fv[17][1], 1.017, places=3)
+        self.assertAlmostEqual(self.fv[18][1], 1.429, places=3)
+        self.assertAlmostEqual(self.fv[19][1], 3.783, places=3)
+        self.assertAlmostEqual(self.fv[20][1], 5.202, places=3)
 
     def test_call_fair_value(self):
         """Test the fair values of puts. Values taken from my implementation."""
-        self.assertAlmostEqual(self.option1.fair_value()[0], 2.174, places=3)
-        self.assertAlmostEqual(self.option2.fair_value()[0], 4.286, places=3)
-        self.assertAlmostEqual(self.option3.fair_value()[0], 5.041, places=3)
-        self.assertAlmostEqual(self.option4.fair_value()[0], 8.223, places=3)
-
-        self.assertAlmostEqual(self.option5.fair_value()[0], 3.181, places=3)
-        self.assertAlmostEqual(self.option6.fair_value()[0], 5.514, places=3)
-        self.assertAlmostEqual(self.option7.fair_value()[0], 6.164, places=3)
-        self.assertAlmostEqual(self.option8.fair_value()[0], 9.502, places=3)
-
-        self.assertAlmostEqual(self.option9.fair_value()[0], 4.396, places=3)
-        self.assertAlmostEqual(self.option10.fair_value()[0], 6.879, places=3)
-        self.assertAlmostEqual(self.option11.fair_value()[0], 7.389, places=3)
-        self.assertAlmostEqual(self.option12.fair_value()[0], 10.849, places=3)
-
-        self.assertAlmostEqual(self.option13.fair_value()[0], 5.794, places=3)
-        self.assertAlmostEqual(self.option14.fair_value()[0], 8.365, places=3)
-        self.assertAlmostEqual(self.option15.fair_value()[0], 8.708, places=3)
-        self.assertAlmostEqual(self.option16.fair_value()[0], 12.259, places=3)
-
-        self.assertAlmostEqual(self.option17.fair_value()[0], 7.346, places=3)
-        self.assertAlmostEqual(self.option18.fair_value()[0], 9.952, places=3)
-        self.assertAlmostEqual(self.option19.fair_value()[0], 10.112, places=3)
-        self.assertAlmostEqual(self.option20.fair_value()[0], 13.725, places=3)
+        self.assertAlmostEqual(self.fv[1][0], 2.174, places=3)
+        self.assertAlmostEqual(self.fv[2][0], 4.286, places=3)
+        self.assertAlmostEqual(self.fv[3][0], 5.041, places=3)
+        self.assertAlmostEqual(self.fv[4][0], 8.223, places=3)
+
+        self.assertAlmostEqual(self.fv[5][0], 3.181, places=3)
+        self.assertAlmostEqual(self.fv[6][0], 5.514, places=3)
+        self.assertAlmostEqual(self.fv[7][0], 6.164, places=3)
+        self.assertAlmostEqual(self.fv[8][0], 9.502, places=3)
+
+        self.assertAlmostEqual(self.fv[9][0], 4.396, places=3)
+        self.assertAlmostEqual(self.fv[10][0], 6.879, places=3)
+        self.assertAlmostEqual(self.fv[11][0], 7.389, places=3)
+        self.assertAlmostEqual(self.fv[12][0], 10.849, places=3)
+
+        self.assertAlmostEqual(self.fv[13][0], 5.794, places=3)
+        self.assertAlmostEqual(self.fv[14][0], 8.365, places=3)
+        self.assertAlmostEqual(self.fv[15][0], 8.708, places=3)
+        self.assertAlmostEqual(self.fv[16][0], 12.259, places=3)
+
+        self.assertAlmostEqual(self.fv[17][0], 7.346, places=3)
+        self.assertAlmostEqual(self.fv[18][0], 9.952, places=3)
+        self.assertAlmostEqual(self.fv[19][0], 10.112, places=3)
+        self.assertAlmostEqual(self.fv[20][0], 13.725, places=3)
+
+    def test_fair_value_batch(self):
+        """Test that the batch fair values match the single ones."""
+        calls, puts = BSMOption.fair_value_batch(
+            *(np.array([getattr(option, field) for option in self.options])
+              for field in ('spot', 'strike', 'tau', 'sigma', 'discount_rate',
+                            'dividend_yield')))
+        np.testing.assert_allclose(calls, [self.fv[i][0] for i in self.fv])
+        np.testing.assert_allclose(puts, [self.fv[i][1] for i in self.fv])
+
+        # Options for which the price equals the intrinsic value.
+        options = [BSMOption(36, 40, 0, 0.2, 0.06, 0),
+                   BSMOption(44, 40, 1, 0, 0.06, 0),
+                   BSMOption(0, 40, 1, 0.2, 0.06, 0),
+                   BSMOption(36, 0, 1, 0.2, 0.06, 0)]
+        calls, puts = BSMOption.fair_value_batch(
+            *(np.array([getattr(option, field) for option in options])
+              for field in ('spot', 'strike', 'tau', 'sigma', 'discount_rate',
+                            'dividend_yield')))
+        for option, call, put in zip(options, calls, puts):
+            self.assertAlmostEqual(option.fair_value()[0], call)
+            self.assertAlmostEqual(option.fair_value()[1], put)
+
+    def test_fair_value_batch_single_precision(self):
+        """Test that single precision batch fair values are close."""
+        calls, puts = BSMOption.fair_value_batch(
+            *(np.array([getattr(option, field) for option in self.options])
+              for field in ('spot', 'strike', 'tau', 'sigma', 'discount_rate',
+                            'dividend_yield')), dtype=np.float32)
+        self.assertEqual(calls.dtype, np.float32)
+        self.assertEqual(puts.dtype, np.float32)
+        for i, call, put in zip(self.fv, calls, puts):
+            self.assertAlmostEqual(self.fv[i][0], call, places=4)
+            self.assertAlmostEqual(self.fv[i][1], put, places=4)
 
 class TestFindImpiedVol(unittest.TestCase):
     """Test the implied volatility finder."""
@@ -264,3 +344,79 @@ class TestFindImpiedVol(unittest.TestCase):
         self.assertAlmostEqual(
             find_implied_vol(13.725, OptionSide.Call, 44, 40, 2, 0.06, 0).root,
             0.4, places=4)
+
+    def test_find_implied_vol_batch(self):
+        """Find all implied vols above in a single call."""
+        prices = np.array([[2.174, 4.286, 5.041, 8.223],
+                           [3.181, 5.514, 6.164, 9.502],
+                           [4.396, 6.879, 7.389, 10.849],
+                           [5.794, 8.365, 8.708, 12.259],
+                           [7.346, 9.952, 10.112, 13.725]])
+        spots = np.array([[36], [38], [40], [42], [44]])
+        taus = np.array([1, 2, 1, 2])
+        vols = find_implied_vol_batch(prices, OptionSide.Call, spots, 40, taus,
+                                      0.06, 0)
+        expected = np.broadcast_to([0.2, 0.2, 0.4, 0.4], prices.shape)
+        for vol, expected_vol in zip(vols.ravel(), expected.ravel()):
+            self.assertAlmostEqual(vol, expected_vol, places=4)
+
+    def test_find_implied_vol_batch_edge_cases(self):
+        """Test that unattainable prices raise."""
+        self.assertRaises(
+            ValueError,
+            find_implied_vol_batch, [2.174, 10], OptionSide.Call, [36, 10],
+            [40, 10], 1, [0.06, 0], 0)
+
+    def test_find_implied_vol_batch_intrinsic(self):
+        """Test that a price rounded to below the intrinsic value gives 0."""
+        cases = [
+            (OptionSide.Put, (602.6369372032461, 962.4606700312567,
+                              0.8154261287457801, -2.7176341381496272e-05,
+                              0.24409747928264824)),
+            (OptionSide.Call, (310.9316336833967, 486.3495234729573,
+                               8.905929560055103, 0.4340435159562497,
+                               -0.14220480329092977))]
+        for side, args in cases:
+            with self.subTest(side=side):
+                price = BSMOption(
+                    *args[:3], 0.0582, *args[3:]).fair_value()[side]
+                self.assertEqual(find_implied_vol(price, side, *args).root, 0)
+                self.assertEqual(find_implied_vol_batch(price, side, *args), 0)
+
+
+@unittest.skipUnless(_bsm_ext, 'the C extension is not built')
+class TestExtension(unittest.TestCase):
+    """Compare the C extension to the vectorized implementation."""
+    def assert_fair_values_match(self, spot, strike, tau, sigma, discount_rate,
+                                 dividend_yield):
+        """Compare the fair values of a single option."""
+        np.testing.assert_allclose(
+            _bsm_ext.fair_value(spot, strike, tau, sigma, discount_rate,
+                                dividend_yield),
+            BSMOption.fair_value_batch(spot, strike, tau, sigma,
+                                       discount_rate, dividend_yield),
+            rtol=1e-9, atol=1e-12)
+
+    def test_fair_value(self):
+        """Test the options of TestFairValue."""
+        for spot in range(36, 45, 2):
+            for sigma in [0.2, 0.4]:
+                for tau in [1, 2]:
+                    self.assert_fair_values_match(spot, 40, tau, sigma, 0.06, 0)
+
+    def test_boundaries(self):
+        """Test tiny vols and maturities and options far from the money."""
+        self.assert_fair_values_match(40, 40, 1, 1e-8, 0.06, 0)
+        self.assert_fair_values_match(40, 40, 1e-10, 0.2, 0.06, 0)
+        self.assert_fair_values_match(1, 1000, 1, 0.2, 0.06, 0)
+        self.assert_fair_values_match(1000, 1, 1, 0.2, 0.06, 0)
+        self.assert_fair_values_match(40, 40, 10, 4, 0.06, 0.03)
+        self.assert_fair_values_match(1e-8, 40, 1, 0.2, 0, 0)
+
+    @given(floats(0.01, 1000), floats(0.01, 1000), floats(1e-4, 10),
+           floats(1e-4, 4), floats(-0.5, 0.5), floats(-0.5, 0.5))
+    def test_random_options(self, spot, strike, tau, sigma, discount_rate,
+                            dividend_yield):
+        """Test random options."""
+        self.assert_fair_values_match(spot, strike, tau, sigma, discount_rate,
+                                      dividend_yield)
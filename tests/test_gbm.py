@@ -1,5 +1,6 @@
 """Test the failure modes of the GBM code."""
 import unittest
+import numpy as np
 
 from Prycing.options.gbm import simulate_gbm
 
@@ -16,3 +17,26 @@ class TestGBMFailure(unittest.TestCase):
         self.assertRaises(
             ValueError,
             simulate_gbm, 5, 0.01, 0.2, 1001, 50, 1)
+
+
+class TestGBMPaths(unittest.TestCase):
+    """Test the paths created by simulate_gbm()."""
+    def test_shape(self):
+        """Test that all paths start at the start value."""
+        paths = simulate_gbm(5, 0.01, 0.2, 1000, 50, 1)
+        self.assertEqual(paths.shape, (51, 1000))
+        self.assertTrue((paths[0] == 5).all())
+
+    def test_single_precision(self):
+        """Test that paths can be simulated in single precision."""
+        paths = simulate_gbm(5, 0.01, 0.2, 1000, 50, 1, dtype=np.float32)
+        self.assertEqual(paths.dtype, np.float32)
+
+    def test_antithetic(self):
+        """Test that the second half of the paths mirrors the first half."""
+        paths = simulate_gbm(5, 0.01, 0.2, 1000, 50, 1)
+        times = np.linspace(0, 1, 51)[:, np.newaxis]
+        np.testing.assert_allclose(
+            paths[:, :500] * paths[:, 500:],
+            np.broadcast_to(25 * np.exp(2 * (0.01 - 0.02) * times), (51, 500)),
+            rtol=1e-10)
@@ -0,0 +1,95 @@
+"""Test the Let's Be Rational implied vol method."""
+import math
+import sys
+import unittest
+from hypothesis import assume, given
+from hypothesis.strategies import floats, sampled_from
+
+from Prycing.options.bsm import OptionSide, find_implied_vol
+from Prycing.options.lets_be_rational import (
+    implied_volatility_from_a_transformed_rational_guess, normalised_black_call,
+    normalised_implied_volatility, normalised_vega,
+    VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM,
+    VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_BELOW_INTRINSIC)
+
+def black(forward, strike, sigma, tau, theta):
+    """The undiscounted Black price."""
+    scaled_vol = sigma * math.sqrt(tau)
+    d1 = math.log(forward / strike) / scaled_vol + scaled_vol / 2
+    d2 = d1 - scaled_vol
+    return theta * (forward * 0.5 * math.erfc(-theta * d1 / math.sqrt(2)) -
+                    strike * 0.5 * math.erfc(-theta * d2 / math.sqrt(2)))
+
+class TestLetsBeRational(unittest.TestCase):
+    """Test the implied vol found from undiscounted prices."""
+    @given(floats(-5, 5), floats(1e-3, 3), sampled_from([1, -1]))
+    def test_round_trip(self, log_moneyness, scaled_vol, theta):
+        """Test that the vol used to price an option is recovered."""
+        # With a forward of 1 and tau of 1, the price is the intrinsic value
+        # plus the time value which is the same for calls and puts.
+        strike = math.exp(-log_moneyness)
+        time_value = math.sqrt(strike) * normalised_black_call(
+            -abs(log_moneyness), scaled_vol)
+        price = max(theta * (1 - strike), 0) + time_value
+        vega = math.sqrt(strike) * normalised_vega(log_moneyness, scaled_vol)
+        # Deep in the money the time value can be lost in the price, then the
+        # vol can't be recovered.
+        assume(time_value > 1e-12 * price and vega > 0)
+        # The error in the vol follows from the rounding error in the price.
+        tolerance = 1e-9 * scaled_vol + 16 * sys.float_info.epsilon * price / vega
+        self.assertLessEqual(
+            abs(implied_volatility_from_a_transformed_rational_guess(
+                price, 1.0, strike, 1.0, theta) - scaled_vol), tolerance)
+        side = OptionSide.Call if theta == 1 else OptionSide.Put
+        self.assertLessEqual(
+            abs(find_implied_vol(price, side, 1.0, strike, 1.0, 0, 0).root -
+                scaled_vol), tolerance)
+
+    def test_tiny_prices(self):
+        """Test out of the money options with prices near underflow."""
+        for strike in [1.65, 1.7, 1.705]:
+            price = math.sqrt(strike) * normalised_black_call(
+                -math.log(strike), 0.014)
+            self.assertGreater(price, 0)
+            self.assertAlmostEqual(
+                implied_volatility_from_a_transformed_rational_guess(
+                    price, 1.0, strike, 1.0, 1), 0.014, places=8)
+            self.assertAlmostEqual(
+                find_implied_vol(price, OptionSide.Call, 1.0, strike, 1.0, 0,
+                                 0).root, 0.014, places=8)
+
+    def test_normalised_black_call(self):
+        """Test the normalised price against the Black formula."""
+        for x in [-2.0, -0.1, 0.0, 0.1, 2.0]:
+            for s in [0.01, 0.5, 3.0]:
+                strike = math.exp(-x)
+                self.assertAlmostEqual(
+                    normalised_black_call(x, s),
+                    black(1.0, strike, s, 1.0, 1) / math.sqrt(strike))
+
+    def test_small_scaled_vols(self):
+        """Test prices and vols where the Black formula cancels."""
+        # Reference prices computed with 50 digits of precision.
+        cases = [(-1e-8, 1e-8, 8.3315470587686299e-10),
+                 (-1e-8, 1e-6, 3.9396222734921182e-7),
+                 (-1e-3, 1e-4, 7.4745602454210835e-29),
+                 (-2e-3, 1e-4, 1.3700124930254956e-94),
+                 (-10.0, 0.3, 5.6430729569969881e-246)]
+        for x, s, price in cases:
+            with self.subTest(x=x, s=s):
+                self.assertLessEqual(
+                    abs(normalised_black_call(x, s) / price - 1), 1e-13)
+                self.assertLessEqual(
+                    abs(normalised_implied_volatility(price, x, 1) / s - 1),
+                    1e-13)
+
+    def test_unattainable_prices(self):
+        """Test the values returned for prices without a vol."""
+        self.assertEqual(
+            implied_volatility_from_a_transformed_rational_guess(
+                0.1, 1.0, 0.8, 1.0, 1),
+            VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_BELOW_INTRINSIC)
+        self.assertEqual(
+            implied_volatility_from_a_transformed_rational_guess(
+                1.0, 1.0, 0.8, 1.0, 1),
+            VOLATILITY_VALUE_TO_SIGNAL_PRICE_IS_ABOVE_MAXIMUM)
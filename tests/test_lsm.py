@@ -8,21 +8,44 @@ from hypothesis.strategies import floats
 
 import Prycing.options.gbm as gbm
 from Prycing.options.lsm import lsm, american_put_payoff, \
-        regress_laguerre_2, regress_linear
+        regress_laguerre_2, regress_linear, EXAMPLE_PATHS
+
+class ExamplePaths(unittest.TestCase):
+    """Compare to the example in the paper."""
+    def test_stopping_rule(self):
+        """Test that the cash flow matrix matches the paper."""
+        cash_flows = lsm(EXAMPLE_PATHS, american_put_payoff(1.1), regress_linear,
+                         0.06, 3, 1.1)[1]
+        np.testing.assert_allclose(
+            cash_flows,
+            [[0, 0, 0, 0.17, 0, 0.34, 0.18, 0.22],
+             [0, 0, 0, 0, 0, 0, 0, 0],
+             [0, 0, 0.07, 0, 0, 0, 0, 0]], atol=1e-12)
+
+    def test_integer_paths(self):
+        """Test that payoffs on integer paths aren't truncated."""
+        paths = (EXAMPLE_PATHS * 100).round().astype(np.int64)
+        value = lsm(paths, american_put_payoff(110.5), regress_linear,
+                    0.06, 3, 110.5)[0]
+        expected = lsm(paths.astype(np.float64), american_put_payoff(110.5),
+                       regress_linear, 0.06, 3, 110.5)[0]
+        self.assertGreater(value[0], 0)
+        np.testing.assert_allclose(value, expected)
+
 
 class Table1Prices(unittest.TestCase):
     """Compate prices to the prices in the paper (table 1)."""
-    def setUp(self):
-        self.prices = pd.read_csv('tests/table_1.csv')['LSM American Price']
+    @classmethod
+    def setUpClass(cls):
+        cls.prices = pd.read_csv('tests/table_1.csv')['LSM American Price']
 
-    def test_table_1_laguerre_2(self):
-        """Compare the first table."""
+        # Both regressions are run on the same paths, so simulate them once.
         number_of_paths = 100000
         number_of_steps = 50
         strike = 40
         discount_rate = 0.06
 
-        i = 0
+        cls.lsm_prices = {regress_laguerre_2: [], regress_linear: []}
         np.random.seed(42)
         for starting_stock_price in np.arange(36, 45, 2):
             for sigma in [0.2, 0.4]:
@@ -30,34 +53,30 @@ class Table1Prices(unittest.TestCase):
                     paths = gbm.simulate_gbm(
                         starting_stock_price, discount_rate, sigma,
                         number_of_paths, number_of_steps, T)
+                    for regress_fun, lsm_prices in cls.lsm_prices.items():
+                        lsm_prices.append(lsm(
+                            paths, american_put_payoff(strike), regress_fun,
+                            discount_rate, T, strike)[0][0])
 
-                    lsm_price = lsm(
-                        paths, american_put_payoff(strike), regress_laguerre_2,
-                        discount_rate, T, strike)[0][0]
-                    self.assertAlmostEqual(lsm_price, self.prices[i])
-                    i += 1
+    def test_table_1_laguerre_2(self):
+        """Compare the first table."""
+        for i, lsm_price in enumerate(self.lsm_prices[regress_laguerre_2]):
+            with self.subTest(i=i):
+                self.assertAlmostEqual(lsm_price, self.prices[i])
 
     def test_table_1_linear(self):
         """Compare the first table."""
-        number_of_paths = 100000
-        number_of_steps = 50
-        strike = 40
-        discount_rate = 0.06
+        for i, lsm_price in enumerate(self.lsm_prices[regress_linear]):
+            with self.subTest(i=i):
+                self.assertAlmostEqual(lsm_price, self.prices[i], places=1)
 
-        i = 0
+    def test_table_1_single_precision(self):
+        """Compare the first entry using single precision paths."""
         np.random.seed(42)
-        for starting_stock_price in np.arange(36, 45, 2):
-            for sigma in [0.2, 0.4]:
-                for T in [1, 2]:
-                    paths = gbm.simulate_gbm(
-                        starting_stock_price, discount_rate, sigma,
-                        number_of_paths, number_of_steps, T)
-
-                    lsm_price = lsm(
-                        paths, american_put_payoff(strike), regress_linear,
-                        discount_rate, T, strike)[0][0]
-                    self.assertAlmostEqual(lsm_price, self.prices[i], places=1)
-                    i += 1
+        paths = gbm.simulate_gbm(36, 0.06, 0.2, 100000, 50, 1, dtype=np.float32)
+        lsm_price = lsm(
+            paths, american_put_payoff(40), regress_laguerre_2, 0.06, 1, 40)[0][0]
+        self.assertAlmostEqual(lsm_price, self.prices[0], places=3)
 
 
 class AmericanMoreExpensive(unittest.TestCase):
@@ -77,7 +96,7 @@ class AmericanMoreExpensive(unittest.TestCase):
             number_of_paths, number_of_steps, T)
         per_path_value = np.maximum(strike - paths[-1], 0) * \
                 math.exp(-discount_rate * T)
-        european_price = sum(per_path_value) / number_of_paths
+        european_price = per_path_value.mean()
 
         lsm_price = lsm(
             paths, american_put_payoff(strike), regress_laguerre_2,
@@ -48,3 +48,26 @@ class TestTree(unittest.TestCase):
         self.assertEqual(
             repr(tree),
             "\n\n1\n3, 2")
+
+    def test_from_nodes(self):
+        """Test that a tree can be created from its nodes."""
+        tree = Tree.from_nodes(2, [1, 2, 3])
+        self.assertEqual(tree.get_node(1, 1), 3)
+        self.assertRaises(
+            ValueError,
+            Tree.from_nodes, 2, [1, 2])
+        self.assertRaises(
+            ValueError,
+            Tree.from_nodes, -2, [1])
+
+    def test_step_backward(self):
+        """Test that a level is filled from the level after it."""
+        tree = Tree.from_nodes(3, [0, 0, 0, 4, 2, 1])
+        tree.step_backward(1, 0.5, 0.25)
+        tree.step_backward(0, 0.5, 0.25)
+        self.assertEqual(tree.get_node(1, 0), 2.5)
+        self.assertEqual(tree.get_node(1, 1), 1.25)
+        self.assertEqual(tree.get_node(0, 0), 1.5625)
+        self.assertRaises(
+            ValueError,
+            tree.step_backward, 2, 0.5, 0.25)